@@ -4,15 +4,18 @@
 from __future__ import annotations
 
 import os
-from datetime import datetime, timedelta
+import time
+from datetime import date, datetime
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Final, List, Optional, Tuple
 import calendar
 
 import mcp.types as types
 from mcp.server.fastmcp import FastMCP
 from mcp.server.transport_security import TransportSecuritySettings
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Configuration
 ROOT_DIR = Path(__file__).resolve().parent
@@ -20,169 +23,340 @@ ASSETS_DIR = ROOT_DIR.parent / "web"
 TEMPLATE_URI = "ui://widget/main.html"
 MIME_TYPE = "text/html+skybridge"
 
-# Production deployment configuration
-WIDGET_DOMAIN = os.environ.get("WIDGET_DOMAIN", "https://web-sandbox.oaiusercontent.com")
-PORT = int(os.environ.get("PORT", 8000))
+# Production deployment configuration, read once at import
+WIDGET_DOMAIN: Final[str] = os.environ.get(
+    "WIDGET_DOMAIN", "https://web-sandbox.oaiusercontent.com"
+)
+PORT: Final[int] = int(os.environ.get("PORT", 8000))
 
+if not WIDGET_DOMAIN.startswith(("http://", "https://")):
+    raise ValueError(f"WIDGET_DOMAIN must be an http(s) URL, got {WIDGET_DOMAIN!r}")
 
-@lru_cache(maxsize=None)
-def load_widget_html() -> str:
-    """Load and cache the widget HTML."""
-    html_path = ASSETS_DIR / "widget.html"
-    return html_path.read_text(encoding="utf8")
+# Time constants
+SECONDS_PER_DAY = 24 * 60 * 60
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
 
 
-def calculate_time_remaining() -> Dict[str, Any]:
-    """Calculate elapsed and remaining percentages for day, week, month, and year."""
-    now = datetime.now()
+# Widget HTML is static, so read it once at import rather than per request.
+WIDGET_HTML = (ASSETS_DIR / "widget.html").read_text(encoding="utf8")
+
+
+@lru_cache(maxsize=16)
+def _days_in_month(year: int, month: int) -> int:
+    """Return the number of days in the given month."""
+    return calendar.monthrange(year, month)[1]
+
+
+@lru_cache(maxsize=8)
+def _days_in_year(year: int) -> int:
+    """Return the number of days in the given year."""
+    return 366 if calendar.isleap(year) else 365
+
+
+@lru_cache(maxsize=8)
+def _iso_week1_monday(year: int) -> int:
+    """Return the proleptic ordinal of the Monday starting ISO week 1 of a year."""
+    jan4 = date(year, 1, 4)
+    return jan4.toordinal() - jan4.weekday()
+
 
+def _iso_week_number(today: date) -> int:
+    """Return the ISO 8601 week number without building an isocalendar tuple."""
+    ordinal = today.toordinal()
+    week1_monday = _iso_week1_monday(today.year)
+    if ordinal < week1_monday:
+        # Early January days that belong to the last week of the previous year
+        week1_monday = _iso_week1_monday(today.year - 1)
+    elif ordinal >= _iso_week1_monday(today.year + 1):
+        # Late December days that belong to week 1 of the next year
+        week1_monday = _iso_week1_monday(today.year + 1)
+    return (ordinal - week1_monday) // 7 + 1
+
+
+@lru_cache(maxsize=1)
+def _day_details(year: int, month: int, day: int) -> Tuple[str, str, str, str]:
+    """Return the (day, week, month, year) detail labels for a calendar day.
+
+    The labels only change at midnight, so repeat calls within a day reuse them.
+    """
+    today = date(year, month, day)
+    today_tuple = today.timetuple()
+    return (
+        time.strftime("%A, %B %d", today_tuple),
+        f"Week {_iso_week_number(today)}",
+        time.strftime("%B %Y", today_tuple),
+        str(year),
+    )
+
+
+def _progress_percentages(
+    day_elapsed_seconds: float,
+    weekday: int,
+    month_day: int,
+    year_day: int,
+    days_in_month: int,
+    days_in_year: int,
+) -> Tuple[float, float, float, float]:
+    """Return elapsed (day, week, month, year) percentages from scalar calendar fields.
+
+    Every period start is a whole number of days before local midnight, so all
+    progress is plain arithmetic on wall-clock seconds.
+    """
     # Day progress (midnight to midnight)
-    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    day_end = day_start + timedelta(days=1)
-    day_elapsed_seconds = (now - day_start).total_seconds()
-    day_total_seconds = 24 * 60 * 60
-    day_percent = (day_elapsed_seconds / day_total_seconds) * 100
+    day_percent = (day_elapsed_seconds / SECONDS_PER_DAY) * 100
 
     # Week progress (Monday = 0)
-    days_since_monday = now.weekday()
-    week_start = day_start - timedelta(days=days_since_monday)
-    week_elapsed_seconds = (now - week_start).total_seconds()
-    week_total_seconds = 7 * 24 * 60 * 60
-    week_percent = (week_elapsed_seconds / week_total_seconds) * 100
+    week_elapsed_seconds = weekday * SECONDS_PER_DAY + day_elapsed_seconds
+    week_percent = (week_elapsed_seconds / SECONDS_PER_WEEK) * 100
 
     # Month progress
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    days_in_month = calendar.monthrange(now.year, now.month)[1]
-    month_end = month_start + timedelta(days=days_in_month)
-    month_elapsed_seconds = (now - month_start).total_seconds()
-    month_total_seconds = days_in_month * 24 * 60 * 60
-    month_percent = (month_elapsed_seconds / month_total_seconds) * 100
+    month_elapsed_seconds = (month_day - 1) * SECONDS_PER_DAY + day_elapsed_seconds
+    month_percent = (month_elapsed_seconds / (days_in_month * SECONDS_PER_DAY)) * 100
 
     # Year progress
-    year_start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-    days_in_year = 366 if calendar.isleap(now.year) else 365
-    year_elapsed_seconds = (now - year_start).total_seconds()
-    year_total_seconds = days_in_year * 24 * 60 * 60
-    year_percent = (year_elapsed_seconds / year_total_seconds) * 100
+    year_elapsed_seconds = (year_day - 1) * SECONDS_PER_DAY + day_elapsed_seconds
+    year_percent = (year_elapsed_seconds / (days_in_year * SECONDS_PER_DAY)) * 100
+
+    return day_percent, week_percent, month_percent, year_percent
+
+
+# Last computed (wall-clock second, result) pair. Percentages are rounded to
+# 0.1%, so results computed within the same second are interchangeable.
+_last_result: Tuple[int, Dict[str, Any]] = (-1, {})
 
-    return {
+
+def calculate_time_remaining() -> Dict[str, Any]:
+    """Calculate elapsed and remaining percentages for day, week, month, and year.
+
+    Results are memoized per wall-clock second; callers must not mutate them.
+    """
+    global _last_result
+
+    now = datetime.now()
+    second = (
+        now.toordinal() * SECONDS_PER_DAY
+        + now.hour * 3600
+        + now.minute * 60
+        + now.second
+    )
+    cached_second, cached_result = _last_result
+    if second == cached_second:
+        return cached_result
+
+    lt = now.timetuple()
+
+    # Seconds since local midnight
+    day_elapsed_seconds = (
+        lt.tm_hour * 3600 + lt.tm_min * 60 + lt.tm_sec + now.microsecond / 1_000_000
+    )
+    day_percent, week_percent, month_percent, year_percent = _progress_percentages(
+        day_elapsed_seconds,
+        lt.tm_wday,
+        lt.tm_mday,
+        lt.tm_yday,
+        _days_in_month(lt.tm_year, lt.tm_mon),
+        _days_in_year(lt.tm_year),
+    )
+
+    # Round each percentage to whole tenths once, so elapsed and remaining are
+    # derived from the same integer and always sum to exactly 100.
+    day_tenths = int(day_percent * 10 + 0.5)
+    week_tenths = int(week_percent * 10 + 0.5)
+    month_tenths = int(month_percent * 10 + 0.5)
+    year_tenths = int(year_percent * 10 + 0.5)
+
+    day_detail, week_detail, month_detail, year_detail = _day_details(
+        lt.tm_year, lt.tm_mon, lt.tm_mday
+    )
+
+    result = {
         "timestamp": now.isoformat(),
         "day": {
             "label": "Today",
-            "elapsed": round(day_percent, 1),
-            "remaining": round(100 - day_percent, 1),
-            "detail": now.strftime("%A, %B %d"),
+            "elapsed": day_tenths / 10,
+            "remaining": (1000 - day_tenths) / 10,
+            "detail": day_detail,
         },
         "week": {
             "label": "This Week",
-            "elapsed": round(week_percent, 1),
-            "remaining": round(100 - week_percent, 1),
-            "detail": f"Week {now.isocalendar()[1]}",
+            "elapsed": week_tenths / 10,
+            "remaining": (1000 - week_tenths) / 10,
+            "detail": week_detail,
         },
         "month": {
             "label": "This Month",
-            "elapsed": round(month_percent, 1),
-            "remaining": round(100 - month_percent, 1),
-            "detail": now.strftime("%B %Y"),
+            "elapsed": month_tenths / 10,
+            "remaining": (1000 - month_tenths) / 10,
+            "detail": month_detail,
         },
         "year": {
             "label": "This Year",
-            "elapsed": round(year_percent, 1),
-            "remaining": round(100 - year_percent, 1),
-            "detail": str(now.year),
+            "elapsed": year_tenths / 10,
+            "remaining": (1000 - year_tenths) / 10,
+            "detail": year_detail,
         },
     }
 
+    _last_result = (second, result)
+    return result
 
-def tool_meta() -> Dict[str, Any]:
-    """Return standard tool metadata with CSP for production deployment."""
-    return {
-        "openai/outputTemplate": TEMPLATE_URI,
-        "openai/widgetAccessible": True,
-        "openai/widgetCSP": {
-            "connect_domains": [],      # Empty - widget doesn't make API calls
-            "resource_domains": [],     # Empty - all assets are inline
-        },
-        "openai/widgetDomain": WIDGET_DOMAIN,
-    }
+
+# Standard tool metadata with CSP for production deployment. None of its
+# inputs vary at runtime, so it is built once and shared by every handler.
+TOOL_META: Dict[str, Any] = {
+    "openai/outputTemplate": TEMPLATE_URI,
+    "openai/widgetAccessible": True,
+    "openai/widgetCSP": {
+        "connect_domains": (),      # Empty - widget doesn't make API calls
+        "resource_domains": (),     # Empty - all assets are inline
+    },
+    "openai/widgetDomain": WIDGET_DOMAIN,
+}
 
 
 # Initialize FastMCP with stateless HTTP mode
 mcp = FastMCP(
     name="time-left",
     stateless_http=True,
+    json_response=True,
     transport_security=TransportSecuritySettings(enable_dns_rebinding_protection=False),
 )
 
 
+# Static MCP listings. Nothing in them varies at runtime, so the models are
+# built once at import and the same lists are returned on every request.
+WIDGET_RESOURCES: List[types.Resource] = [
+    types.Resource(
+        name="Time Left Widget",
+        uri=TEMPLATE_URI,
+        description="Progress bar visualization for time remaining",
+        mimeType=MIME_TYPE,
+        _meta=TOOL_META,
+    )
+]
+
+WIDGET_RESOURCE_TEMPLATES: List[types.ResourceTemplate] = [
+    types.ResourceTemplate(
+        name="Time Left Widget",
+        uriTemplate=TEMPLATE_URI,
+        description="Progress bar visualization for time remaining",
+        mimeType=MIME_TYPE,
+        _meta=TOOL_META,
+    )
+]
+
+TOOLS: List[types.Tool] = [
+    types.Tool(
+        name="get_time_remaining",
+        title="Get Time Remaining",
+        description="Use this when the user asks how much time is left in the day, week, month, or year, or asks about time remaining, time progress, or similar questions about elapsed time.",
+        inputSchema={"type": "object", "properties": {}},
+        _meta=TOOL_META,
+        annotations={
+            "destructiveHint": False,
+            "openWorldHint": False,
+            "readOnlyHint": True,
+        },
+    ),
+]
+
+
 # Register widget as MCP resource
 @mcp._mcp_server.list_resources()
 async def _list_resources() -> List[types.Resource]:
-    return [
-        types.Resource(
-            name="Time Left Widget",
-            uri=TEMPLATE_URI,
-            description="Progress bar visualization for time remaining",
-            mimeType=MIME_TYPE,
-            _meta=tool_meta(),
-        )
-    ]
+    return WIDGET_RESOURCES
 
 
 @mcp._mcp_server.list_resource_templates()
 async def _list_resource_templates() -> List[types.ResourceTemplate]:
-    return [
-        types.ResourceTemplate(
-            name="Time Left Widget",
-            uriTemplate=TEMPLATE_URI,
-            description="Progress bar visualization for time remaining",
-            mimeType=MIME_TYPE,
-            _meta=tool_meta(),
-        )
-    ]
+    return WIDGET_RESOURCE_TEMPLATES
+
+
+# The widget read response is fully static, so no request touches the filesystem
+# or rebuilds the HTML payload.
+WIDGET_READ_RESULT = types.ServerResult(
+    types.ReadResourceResult(
+        contents=[
+            types.TextResourceContents(
+                uri=TEMPLATE_URI,
+                mimeType=MIME_TYPE,
+                text=WIDGET_HTML,
+                _meta=TOOL_META,
+            )
+        ]
+    )
+)
 
 
 async def _handle_read_resource(req: types.ReadResourceRequest) -> types.ServerResult:
     """Handle resource read requests."""
-    if str(req.params.uri) != TEMPLATE_URI:
-        return types.ServerResult(
-            types.ReadResourceResult(
+    uri_str = str(req.params.uri)
+    if uri_str != TEMPLATE_URI:
+        return types.ServerResult.model_construct(
+            root=types.ReadResourceResult.model_construct(
                 contents=[],
-                _meta={"error": f"Unknown resource: {req.params.uri}"},
+                _meta={"error": f"Unknown resource: {uri_str}"},
             )
         )
 
-    return types.ServerResult(
-        types.ReadResourceResult(
-            contents=[
-                types.TextResourceContents(
-                    uri=TEMPLATE_URI,
-                    mimeType=MIME_TYPE,
-                    text=load_widget_html(),
-                    _meta=tool_meta(),
-                )
-            ]
-        )
-    )
+    return WIDGET_READ_RESULT
 
 
 # Register tool
 @mcp._mcp_server.list_tools()
 async def _list_tools() -> List[types.Tool]:
-    return [
-        types.Tool(
-            name="get_time_remaining",
-            title="Get Time Remaining",
-            description="Use this when the user asks how much time is left in the day, week, month, or year, or asks about time remaining, time progress, or similar questions about elapsed time.",
-            inputSchema={"type": "object", "properties": {}},
-            _meta=tool_meta(),
-            annotations={
-                "destructiveHint": False,
-                "openWorldHint": False,
-                "readOnlyHint": True,
-            },
-        ),
-    ]
+    return TOOLS
+
+
+# Last (time data, response) pair for get_time_remaining. The time data is
+# memoized per second, so an identical dict means the response can be reused.
+_last_tool_result: Tuple[Dict[str, Any], Optional[types.ServerResult]] = ({}, None)
+
+
+# User-facing summary, filled straight from the time data dict.
+TOOL_TEXT_TEMPLATE = "Here's your time progress: {day[remaining]}% of today remains, {week[remaining]}% of this week, {month[remaining]}% of this month, and {year[remaining]}% of {year[detail]}."
+
+
+def _time_remaining_result(time_data: Dict[str, Any]) -> types.ServerResult:
+    """Build the get_time_remaining response, reusing it while time_data is unchanged."""
+    global _last_tool_result
+
+    cached_data, cached_result = _last_tool_result
+    if time_data is cached_data and cached_result is not None:
+        return cached_result
+
+    # Widget data goes in structuredContent (becomes window.openai.toolOutput)
+    # OpenAI directives go in _meta
+    # Every field is produced by this module, so skip pydantic validation.
+    result = types.ServerResult.model_construct(
+        root=types.CallToolResult.model_construct(
+            content=[
+                types.TextContent.model_construct(
+                    type="text",
+                    text=TOOL_TEXT_TEMPLATE.format_map(time_data),
+                )
+            ],
+            structuredContent=time_data,  # All widget data here
+            _meta=TOOL_META,
+        )
+    )
+    _last_tool_result = (time_data, result)
+    return result
+
+
+@lru_cache(maxsize=64)
+def _unknown_tool_result(tool_name: str) -> types.ServerResult:
+    """Build the error response for an unknown tool, pooled per tool name."""
+    return types.ServerResult.model_construct(
+        root=types.CallToolResult.model_construct(
+            content=[
+                types.TextContent.model_construct(
+                    type="text", text=f"Unknown tool: {tool_name}"
+                )
+            ],
+            isError=True,
+        )
+    )
 
 
 async def _handle_call_tool(req: types.CallToolRequest) -> types.ServerResult:
@@ -190,29 +364,11 @@ async def _handle_call_tool(req: types.CallToolRequest) -> types.ServerResult:
     tool_name = req.params.name
 
     if tool_name == "get_time_remaining":
-        time_data = calculate_time_remaining()
-
-        # Widget data goes in structuredContent (becomes window.openai.toolOutput)
-        # OpenAI directives go in _meta
-        return types.ServerResult(
-            types.CallToolResult(
-                content=[
-                    types.TextContent(
-                        type="text",
-                        text=f"Here's your time progress: {time_data['day']['remaining']}% of today remains, {time_data['week']['remaining']}% of this week, {time_data['month']['remaining']}% of this month, and {time_data['year']['remaining']}% of {time_data['year']['detail']}.",
-                    )
-                ],
-                structuredContent=time_data,  # All widget data here
-                _meta=tool_meta(),
-            )
-        )
+        # No batching needed: this path never awaits, so concurrent calls run
+        # one after another and share the per-second memoized result.
+        return _time_remaining_result(calculate_time_remaining())
 
-    return types.ServerResult(
-        types.CallToolResult(
-            content=[types.TextContent(type="text", text=f"Unknown tool: {tool_name}")],
-            isError=True,
-        )
-    )
+    return _unknown_tool_result(tool_name)
 
 
 # Register handlers
@@ -220,23 +376,87 @@ mcp._mcp_server.request_handlers[types.CallToolRequest] = _handle_call_tool
 mcp._mcp_server.request_handlers[types.ReadResourceRequest] = _handle_read_resource
 
 
-# Create ASGI app with CORS
+# Static headers for a fully open, credential-less CORS policy
+CORS_HEADERS: List[Tuple[bytes, bytes]] = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"*"),
+    (b"access-control-allow-headers", b"*"),
+]
+
+# Preflight replies also echo the requested headers (see WildcardCORSMiddleware)
+CORS_PREFLIGHT_HEADERS: List[Tuple[bytes, bytes]] = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"*"),
+    (b"access-control-max-age", b"600"),
+]
+
+
+class WildcardCORSMiddleware:
+    """ASGI middleware that allows every origin, method, and header.
+
+    Answers preflight requests directly and appends the static CORS headers to
+    every other HTTP response, with no per-request origin matching. Preflights
+    echo Access-Control-Request-Headers back, because a literal ``*`` does not
+    cover ``Authorization`` under the Fetch spec.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS":
+            headers = dict(scope["headers"])
+            if b"access-control-request-method" in headers:
+                allow_headers = headers.get(b"access-control-request-headers", b"*")
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 204,
+                        "headers": [
+                            *CORS_PREFLIGHT_HEADERS,
+                            (b"access-control-allow-headers", allow_headers),
+                        ],
+                    }
+                )
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *CORS_HEADERS]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+# Create ASGI app with compression and CORS
 app = mcp.streamable_http_app()
 
-try:
-    from starlette.middleware.cors import CORSMiddleware
+# Plain JSON responses (not SSE) let the widget HTML compress on the wire
+app.add_middleware(GZipMiddleware, minimum_size=512)
 
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
-except ImportError:
-    pass
+app.add_middleware(WildcardCORSMiddleware)
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=PORT)
+    # Handlers are stateless, so requests can be spread across worker processes.
+    # uvicorn[standard] provides uvloop and httptools, which uvicorn selects
+    # automatically when they are installed.
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+    # Worker processes must import the app themselves; a single worker reuses
+    # the one already built here.
+    module_name = __spec__.name if __spec__ is not None else "main"
+    uvicorn.run(
+        f"{module_name}:app" if workers > 1 else app,
+        host="0.0.0.0",
+        port=PORT,
+        workers=workers,
+        access_log=False,
+    )
@@ -1,12 +1,28 @@
 # ABOUTME: Unit tests for the Time Left MCP server.
 # ABOUTME: Tests the time calculation logic with various dates and edge cases.
 
-from datetime import datetime
+import asyncio
+from datetime import date, datetime, timedelta
+from pathlib import Path
 from unittest.mock import patch
 
+import mcp.types as types
 import pytest
 
-from main import calculate_time_remaining, tool_meta, load_widget_html, TEMPLATE_URI
+from main import (
+    calculate_time_remaining,
+    _handle_call_tool,
+    _handle_read_resource,
+    _iso_week_number,
+    _progress_percentages,
+    _time_remaining_result,
+    WildcardCORSMiddleware,
+    ASSETS_DIR,
+    TOOL_META,
+    TOOL_TEXT_TEMPLATE,
+    WIDGET_HTML,
+    TEMPLATE_URI,
+)
 
 
 class TestCalculateTimeRemaining:
@@ -38,7 +54,18 @@ class TestCalculateTimeRemaining:
 
         for period in ["day", "week", "month", "year"]:
             total = result[period]["elapsed"] + result[period]["remaining"]
-            assert total == pytest.approx(100.0, abs=0.2)  # Allow rounding error
+            assert total == 100.0
+
+    @patch("main.datetime")
+    def test_elapsed_plus_remaining_is_exact_at_half_tenths(self, mock_datetime):
+        """Rounding a half-tenth keeps elapsed + remaining at exactly 100."""
+        # 00:00:43.2 is exactly 0.05% of the day
+        mock_datetime.now.return_value = datetime(2025, 6, 15, 0, 0, 43, 200000)
+
+        result = calculate_time_remaining()
+
+        assert result["day"]["elapsed"] == 0.1
+        assert result["day"]["remaining"] == 99.9
 
     def test_percentages_are_in_valid_range(self):
         """Verify all percentages are between 0 and 100."""
@@ -187,6 +214,29 @@ class TestCalculateTimeRemaining:
 
         assert result["year"]["detail"] == "2025"
 
+    @patch("main.datetime")
+    def test_reuses_result_within_same_second(self, mock_datetime):
+        """Calls within the same second return the memoized result."""
+        mock_datetime.now.return_value = datetime(2025, 6, 15, 12, 0, 0)
+        first = calculate_time_remaining()
+
+        mock_datetime.now.return_value = datetime(2025, 6, 15, 12, 0, 0, 500000)
+        second = calculate_time_remaining()
+
+        assert second is first
+
+    @patch("main.datetime")
+    def test_recomputes_result_in_next_second(self, mock_datetime):
+        """A call in a later second computes a fresh result."""
+        mock_datetime.now.return_value = datetime(2025, 6, 15, 12, 0, 0)
+        first = calculate_time_remaining()
+
+        mock_datetime.now.return_value = datetime(2025, 6, 15, 12, 0, 1)
+        second = calculate_time_remaining()
+
+        assert second is not first
+        assert second["timestamp"] == "2025-06-15T12:00:01"
+
     def test_timestamp_is_iso_format(self):
         """Verify timestamp is in ISO format."""
         result = calculate_time_remaining()
@@ -195,59 +245,285 @@ class TestCalculateTimeRemaining:
         datetime.fromisoformat(result["timestamp"])
 
 
+class TestIsoWeekNumber:
+    """Tests for the ISO week number helper."""
+
+    def test_matches_isocalendar(self):
+        """Verify the week number matches isocalendar across year boundaries."""
+        day = date(2019, 12, 1)
+        while day < date(2032, 2, 1):
+            assert _iso_week_number(day) == day.isocalendar()[1], day
+            day += timedelta(days=1)
+
+    def test_early_january_in_previous_year_week(self):
+        """Jan 1, 2021 (a Friday) falls in week 53 of 2020."""
+        assert _iso_week_number(date(2021, 1, 1)) == 53
+
+    def test_late_december_in_next_year_week(self):
+        """Dec 29, 2025 (a Monday) falls in week 1 of 2026."""
+        assert _iso_week_number(date(2025, 12, 29)) == 1
+
+
+class TestProgressPercentages:
+    """Tests for the scalar progress kernel."""
+
+    def test_period_starts_are_zero(self):
+        """Monday, Jan 1 at midnight starts every period."""
+        assert _progress_percentages(0, 0, 1, 1, 31, 365) == (0.0, 0.0, 0.0, 0.0)
+
+    def test_last_second_approaches_hundred(self):
+        """The last second of Sunday, Dec 31 is nearly 100% through every period."""
+        percentages = _progress_percentages(86399, 6, 31, 365, 31, 365)
+
+        for percent in percentages:
+            assert 99.9 < percent < 100.0
+
+
+class TestTimeRemainingResult:
+    """Tests for the get_time_remaining response builder."""
+
+    @patch("main.datetime")
+    def test_reuses_response_for_same_time_data(self, mock_datetime):
+        """The same memoized time data yields the same response object."""
+        mock_datetime.now.return_value = datetime(2025, 6, 15, 12, 0, 0)
+        time_data = calculate_time_remaining()
+
+        assert _time_remaining_result(time_data) is _time_remaining_result(time_data)
+
+    @patch("main.datetime")
+    def test_response_carries_time_data(self, mock_datetime):
+        """The response exposes time data as structured content."""
+        mock_datetime.now.return_value = datetime(2025, 6, 15, 12, 0, 0)
+        time_data = calculate_time_remaining()
+
+        result = _time_remaining_result(time_data).root
+
+        assert result.structuredContent == time_data
+        assert "50.0% of today remains" in result.content[0].text
+
+    @patch("main.datetime")
+    def test_response_text_summarizes_all_periods(self, mock_datetime):
+        """The text content mentions the remaining share of every period."""
+        mock_datetime.now.return_value = datetime(2025, 6, 15, 12, 0, 0)
+        time_data = calculate_time_remaining()
+
+        text = _time_remaining_result(time_data).root.content[0].text
+
+        assert text == (
+            "Here's your time progress: 50.0% of today remains, 7.1% of this week, "
+            "51.7% of this month, and 54.7% of 2025."
+        )
+
+
+class TestConstructedModels:
+    """Tests that unvalidated response models serialize like validated ones."""
+
+    @staticmethod
+    def _assert_same_wire_format(constructed, validated):
+        """Compare the JSON-RPC wire format of two response models."""
+        dump_options = {"by_alias": True, "mode": "json", "exclude_none": True}
+
+        assert constructed.model_dump(**dump_options) == validated.model_dump(
+            **dump_options
+        )
+
+    @patch("main.datetime")
+    def test_time_remaining_result(self, mock_datetime):
+        """Verify the tool response serializes like its validated form."""
+        mock_datetime.now.return_value = datetime(2025, 6, 15, 12, 0, 0)
+        time_data = calculate_time_remaining()
+
+        self._assert_same_wire_format(
+            _time_remaining_result(time_data),
+            types.ServerResult(
+                types.CallToolResult(
+                    content=[
+                        types.TextContent(
+                            type="text",
+                            text=TOOL_TEXT_TEMPLATE.format_map(time_data),
+                        )
+                    ],
+                    structuredContent=time_data,
+                    _meta=TOOL_META,
+                )
+            ),
+        )
+
+    def test_unknown_tool_result(self):
+        """Verify the unknown tool error serializes like its validated form."""
+        req = types.CallToolRequest(
+            method="tools/call", params={"name": "nope", "arguments": {}}
+        )
+
+        self._assert_same_wire_format(
+            asyncio.run(_handle_call_tool(req)),
+            types.ServerResult(
+                types.CallToolResult(
+                    content=[types.TextContent(type="text", text="Unknown tool: nope")],
+                    isError=True,
+                )
+            ),
+        )
+
+    def test_unknown_resource_result(self):
+        """Verify the unknown resource error serializes like its validated form."""
+        req = types.ReadResourceRequest(
+            method="resources/read", params={"uri": "ui://widget/other.html"}
+        )
+
+        self._assert_same_wire_format(
+            asyncio.run(_handle_read_resource(req)),
+            types.ServerResult(
+                types.ReadResourceResult(
+                    contents=[],
+                    _meta={"error": "Unknown resource: ui://widget/other.html"},
+                )
+            ),
+        )
+
+
 class TestToolMeta:
-    """Tests for the tool_meta function."""
+    """Tests for the TOOL_META constant."""
 
     def test_returns_output_template(self):
-        """Verify tool_meta returns the output template URI."""
-        result = tool_meta()
+        """Verify TOOL_META contains the output template URI."""
+        result = TOOL_META
 
         assert "openai/outputTemplate" in result
         assert result["openai/outputTemplate"] == TEMPLATE_URI
 
     def test_returns_widget_accessible(self):
-        """Verify tool_meta marks widget as accessible."""
-        result = tool_meta()
+        """Verify TOOL_META marks widget as accessible."""
+        result = TOOL_META
 
         assert "openai/widgetAccessible" in result
         assert result["openai/widgetAccessible"] is True
 
 
-class TestLoadWidgetHtml:
-    """Tests for the load_widget_html function."""
+class TestWidgetHtml:
+    """Tests for the WIDGET_HTML constant."""
 
-    def test_returns_string(self):
+    def test_is_string(self):
         """Verify widget HTML is loaded as a string."""
-        # Clear the cache to ensure fresh load
-        load_widget_html.cache_clear()
-
-        result = load_widget_html()
-
-        assert isinstance(result, str)
-        assert len(result) > 0
+        assert isinstance(WIDGET_HTML, str)
+        assert len(WIDGET_HTML) > 0
 
     def test_contains_html_structure(self):
         """Verify widget HTML contains expected elements."""
-        load_widget_html.cache_clear()
+        assert "<!DOCTYPE html>" in WIDGET_HTML
+        assert "<html" in WIDGET_HTML
+        assert "progress" in WIDGET_HTML.lower()
+        assert "window.openai" in WIDGET_HTML
+
+    def test_matches_file_on_disk(self):
+        """Verify the preloaded HTML matches the widget file."""
+        html_path = ASSETS_DIR / "widget.html"
+
+        assert WIDGET_HTML == html_path.read_text(encoding="utf8")
+
+
+class TestHandleCallTool:
+    """Tests for the CallTool handler."""
+
+    @staticmethod
+    def _call(name):
+        req = types.CallToolRequest(
+            method="tools/call", params={"name": name, "arguments": {}}
+        )
+        return asyncio.run(_handle_call_tool(req))
+
+    def test_unknown_tool_returns_error(self):
+        """Verify unknown tools return an error result naming the tool."""
+        result = self._call("nope").root
+
+        assert result.isError is True
+        assert result.content[0].text == "Unknown tool: nope"
+
+    def test_unknown_tool_result_is_pooled(self):
+        """Verify repeat calls for the same unknown tool share one response."""
+        assert self._call("nope") is self._call("nope")
+        assert self._call("nope") is not self._call("other")
+
+
+class TestHandleReadResource:
+    """Tests for the ReadResource handler."""
+
+    def test_serves_widget_html_without_file_io(self):
+        """Verify reading the widget never touches the filesystem."""
+        req = types.ReadResourceRequest(
+            method="resources/read", params={"uri": TEMPLATE_URI}
+        )
+
+        with patch.object(Path, "read_text", side_effect=AssertionError("file read")):
+            result = asyncio.run(_handle_read_resource(req))
+
+        assert result.root.contents[0].text == WIDGET_HTML
+
+    def test_unknown_resource_returns_error(self):
+        """Verify unknown URIs return empty contents with an error."""
+        req = types.ReadResourceRequest(
+            method="resources/read", params={"uri": "ui://widget/other.html"}
+        )
+
+        result = asyncio.run(_handle_read_resource(req))
+
+        assert result.root.contents == []
+        assert "Unknown resource" in result.root.meta["error"]
+
+
+class TestWildcardCORSMiddleware:
+    """Tests for the CORS middleware."""
+
+    @staticmethod
+    def _call(method, headers):
+        """Run a request through the middleware and return the sent messages."""
+
+        async def inner_app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        scope = {"type": "http", "method": method, "headers": headers}
+        asyncio.run(WildcardCORSMiddleware(inner_app)(scope, receive, send))
+        return messages
 
-        result = load_widget_html()
+    def test_preflight_is_answered_directly(self):
+        """Verify preflight requests get a 204 without reaching the app."""
+        messages = self._call(
+            "OPTIONS", [(b"access-control-request-method", b"POST")]
+        )
 
-        assert "<!DOCTYPE html>" in result
-        assert "<html" in result
-        assert "progress" in result.lower()
-        assert "window.openai" in result
+        assert messages[0]["status"] == 204
+        assert (b"access-control-allow-origin", b"*") in messages[0]["headers"]
+        assert (b"access-control-allow-headers", b"*") in messages[0]["headers"]
+        assert messages[1]["body"] == b""
 
-    def test_caching_works(self):
-        """Verify the LRU cache is working."""
-        load_widget_html.cache_clear()
+        # A literal "*" does not cover Authorization, so requested headers echo back
+        messages = self._call(
+            "OPTIONS",
+            [
+                (b"access-control-request-method", b"POST"),
+                (b"access-control-request-headers", b"authorization,content-type"),
+            ],
+        )
 
-        # Call twice
-        result1 = load_widget_html()
-        result2 = load_widget_html()
+        assert messages[0]["status"] == 204
+        assert (
+            b"access-control-allow-headers",
+            b"authorization,content-type",
+        ) in messages[0]["headers"]
 
-        # Should be the same object (cached)
-        assert result1 is result2
+    def test_adds_headers_to_regular_responses(self):
+        """Verify regular responses pass through with CORS headers added."""
+        messages = self._call("POST", [(b"origin", b"https://chatgpt.com")])
 
-        # Check cache info
-        cache_info = load_widget_html.cache_info()
-        assert cache_info.hits >= 1
+        assert messages[0]["status"] == 200
+        assert (b"access-control-allow-origin", b"*") in messages[0]["headers"]
+        assert messages[1]["body"] == b"ok"